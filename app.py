@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 from os import PathLike, mkdir, path
 from posix import listdir
-from typing import Any, Mapping, List
+from typing import Any, Dict, Mapping, List, Optional
 from json import dumps, loads
+from hashlib import sha256
+from re import match
 from aws_cdk import (
   core,
   aws_cloudformation as cf,
@@ -139,7 +141,35 @@ class JobDefinition:
     if not 'description' in self.__props:
       return "Creates the %s environment" % self.module_name
     return self.__props['description']
-  
+
+  @property
+  def shard(self)->Optional[str]:
+    '''
+    Gets the optional orchestrator shard label that pins this module to a specific shard.
+    '''
+    if not 'shard' in self.__props:
+      return None
+
+    shard = str(self.__props['shard'])
+    assert match(r'^[A-Za-z0-9-]+$', shard), "File {file} has shard '{shard}'; use only letters, digits and hyphens".format(
+      file=self.file_name,
+      shard=shard)
+    return shard
+
+  @property
+  def signal_mode(self)->str:
+    '''
+    Gets how steps signal the module's wait condition; `step` (one signal per stack) or `summary` (one per module).
+    '''
+    if not 'signal' in self.__props:
+      return 'step'
+
+    signal_mode = self.__props['signal']
+    assert signal_mode in ['step','summary'], "File {file} has unknown signal '{signal}'".format(
+      file=self.file_name,
+      signal=signal_mode)
+    return signal_mode
+
   @property
   def stacks(self)->List[JobDefinitionStep]:
     '''
@@ -165,10 +195,27 @@ class Functions(core.Construct):
   '''
   def __init__(self, scope: core.Construct, id:str)->None:
     super().__init__(scope,id)
+
+    '''
+    Configure the shared structured logger (context keys `logLevel` and `logSampleRate`).
+    '''
+    log_level = self.node.try_get_context('logLevel')
+    if log_level is None:
+      log_level = 'INFO'
+
+    log_sample_rate = self.node.try_get_context('logSampleRate')
+    if log_sample_rate is None:
+      log_sample_rate = 0.1
+
+    log_environment = {
+      'LOG_LEVEL': str(log_level),
+      'LOG_SAMPLE_RATE': str(log_sample_rate),
+    }
     
     self.preaction_function = lambda_.Function(self,'Preaction',
       function_name='Prepare-Stack',
       code = Functions.get_lambda_code("preaction"),
+      environment= log_environment,
       timeout=core.Duration.minutes(1),
       tracing= lambda_.Tracing.ACTIVE,
       runtime= lambda_.Runtime.PYTHON_3_9,
@@ -177,6 +224,7 @@ class Functions(core.Construct):
     self.launch_function = lambda_.Function(self,'Launch',
       function_name='Create-Stack_Task',
       code = Functions.get_lambda_code("launch"),
+      environment= log_environment,
       timeout=core.Duration.minutes(1),
       tracing= lambda_.Tracing.ACTIVE,
       runtime= lambda_.Runtime.PYTHON_3_9,
@@ -185,6 +233,7 @@ class Functions(core.Construct):
     self.monitor_function = lambda_.Function(self,'Monitor',
       function_name='Get-StackStatus_Task',
       code = Functions.get_lambda_code("monitor"),
+      environment= log_environment,
       timeout=core.Duration.minutes(1),
       tracing= lambda_.Tracing.ACTIVE,
       runtime= lambda_.Runtime.PYTHON_3_9,
@@ -193,6 +242,7 @@ class Functions(core.Construct):
     self.complete_functon = lambda_.Function(self,'Complete',
       function_name='Signal-Complete_Task',
       code = Functions.get_lambda_code("complete"),
+      environment= log_environment,
       timeout=core.Duration.minutes(1),
       tracing= lambda_.Tracing.ACTIVE,
       runtime= lambda_.Runtime.PYTHON_3_9,
@@ -219,17 +269,13 @@ class Functions(core.Construct):
   def get_lambda_code(lambda_name:str)-> lambda_.Code:
     '''
     Gets the correct package for rootdir\\src\\name.
+    The package must be built first, as it bundles the shared sources (e.g., logger.py).
     '''
     fileName = path.join(bin_directory,lambda_name+'.zip')
     if path.exists(fileName):
       return lambda_.Code.from_asset(fileName)
 
-    fileName = path.join(root_directory,"src",lambda_name, "index.py")
-    if path.exists(fileName):
-      with open(fileName, "r") as f:
-        return lambda_.Code.from_inline(f.read())
-    
-    raise FileNotFoundError("Unable to find lambda_code for %s" % lambda_name)
+    raise FileNotFoundError("Unable to find lambda_code for %s; run ./build.py functions" % lambda_name)
 
 class DeploymentWorkflow(core.Construct):
   '''
@@ -264,13 +310,14 @@ class DeploymentWorkflow(core.Construct):
       lambda_function= self.functions.complete_functon,
       result_path='$.signal',
       input_path='$.inputRequest')
+    DeploymentWorkflow.add_signal_retry(complete_job)
 
+    '''
+    Nest the failed status inside inputRequest so Signal-Completion reports FAILURE.
+    '''
     set_error_info = sf.Pass(self,'Set-ErrorInfo',
-      parameters={
-        'inputRequest.$': '$.inputRequest',
-        'inputRequest.error.$':'$.monitor.Payload',
-        'is_error': True
-      })
+      input_path='$.monitor.Payload',
+      result_path='$.inputRequest.error')
 
     set_error_info.next(complete_job)
 
@@ -300,10 +347,7 @@ class DeploymentWorkflow(core.Construct):
     terminal_state= sf.Succeed(self,'Ready')
     is_success = sf.Choice(self,'Is-Success')
     is_success.when(
-      sf.Condition.is_not_present('$.is_error'),
-      terminal_state)
-    is_success.when(
-      sf.Condition.boolean_equals('$.is_error',True),
+      sf.Condition.is_present('$.inputRequest.error'),
       sf.Fail(self,'Stack-Error',
         error='Failed to create stack.  Please see $.inputRequest.error for details.'))
     is_success.otherwise(terminal_state)
@@ -314,42 +358,104 @@ class DeploymentWorkflow(core.Construct):
     '''
     stack_list = sf.Map(self,'Enumerate-Stacks',
       input_path='$.stacks',
-      max_concurrency=1)
-    stack_list.iterator(before_creation)
+      result_path='$.results',
+      max_concurrency=1,
+      parameters={
+        'inputRequest.$': '$$.Map.Item.Value.inputRequest',
+        'correlation': {
+          'execution_id.$': '$$.Execution.Id',
+        },
+      })
+
+    '''
+    Add the execution id to every task's inputRequest for log correlation.
+    '''
+    set_correlation = sf.Pass(self,'Set-Correlation',
+      parameters={
+        'inputRequest.$': 'States.JsonMerge($.inputRequest, $.correlation, false)',
+      })
+
+    stack_list.iterator(set_correlation)
+    set_correlation.next(before_creation)
     before_creation.next(create_stack)
 
+    '''
+    Modules with `"signal": "summary"` send one signal with every step's result.
+    '''
+    signal_module = sft.LambdaInvoke(self,'Signal-Module',
+      lambda_function= self.functions.complete_functon,
+      result_path='$.signal',
+      payload= sf.TaskInput.from_object({
+        'module_name.$': '$.module_name',
+        'wait_handle.$': '$.wait_handle',
+        'execution_id.$': '$$.Execution.Id',
+        'results.$': '$.results[*].signal.Payload',
+      }))
+    DeploymentWorkflow.add_signal_retry(signal_module)
+
+    '''
+    Report FAILURE for the module when any step fails or the summary is lost,
+    so the wait condition fails immediately instead of timing out.
+    '''
+    signal_module_failure = sft.LambdaInvoke(self,'Signal-ModuleFailure',
+      lambda_function= self.functions.complete_functon,
+      result_path='$.signal',
+      payload= sf.TaskInput.from_object({
+        'module_name.$': '$.module_name',
+        'wait_handle.$': '$.wait_handle',
+        'execution_id.$': '$$.Execution.Id',
+        'results': [],
+        'error.$': '$.signal_error',
+      }))
+    DeploymentWorkflow.add_signal_retry(signal_module_failure)
+    signal_module_failure.next(sf.Fail(self,'Module-Error',
+      error='Failed to deploy or signal the module.  Please see $.signal_error for details.'))
+
+    stack_list.add_catch(signal_module_failure,
+      errors=[sf.Errors.ALL],
+      result_path='$.signal_error')
+    signal_module.add_catch(signal_module_failure,
+      errors=[sf.Errors.ALL],
+      result_path='$.signal_error')
+
+    is_summary = sf.Choice(self,'Is-Summary')
+    is_summary.when(
+      sf.Condition.and_(
+        sf.Condition.is_present('$.summary'),
+        sf.Condition.boolean_equals('$.summary',True)),
+      signal_module)
+    is_summary.otherwise(sf.Succeed(self,'Module-Ready'))
+    stack_list.next(is_summary)
+
     self.state_machine = sf.StateMachine(self,'StateMachine',
       state_machine_name='Cfn-MultiRegion-Orchestrator',
       tracing_enabled=True,
       definition=stack_list)
 
-class CfnMultiRegionOrcheratorStack(core.Stack):
-  '''
-  Represents the Amazon CloudFormation Stack that contains the deployment tool.
-  After deploying the Step Function, the Stack will also deploy every file under `job-definitions`.
+  @staticmethod
+  def add_signal_retry(task:sft.LambdaInvoke)->None:
+    '''
+    Retries signaling when the wait handle or the Complete function times out.
+    SignalRejectedError (e.g., an expired wait handle) is permanent and is not retried.
+    '''
+    task.add_retry(
+      errors=['SignalError', 'Sandbox.Timedout', sf.Errors.TIMEOUT],
+      interval=core.Duration.seconds(2),
+      backoff_rate=2,
+      max_attempts=3)
 
-  If there are multiple job-definitions files they will each run in parallel. Its declared steps run sequentially.
+class OrchestratorShard(core.NestedStack):
   '''
-  def __init__(self, scope:core.Construct,id:str) -> None:
+  Represents a nested stack that launches a subset of the job-definitions.
+  Each shard has its own resource limit and only updates when one of its modules changes.
+  '''
+  def __init__(self, scope:core.Construct, id:str, deploy_tool:DeploymentWorkflow, job_definitions:List[JobDefinition]) -> None:
     super().__init__(scope,id)
-    core.Tags.of(self).add('topology','blueprint:cfn-multiregion-orchestration')
+    assert not deploy_tool is None, "OrchestratorShard init called without deploy_tool"
+    assert not job_definitions is None, "OrchestratorShard init called without job_definitions"
 
-    self.deploy_tool = DeploymentWorkflow(self,'Workflow')
-    self.provision_everything()
-    
-  def provision_everything(self):
-    '''
-    Discovers all job-definitions within the `job-definitions` folder.
-    
-    Job Definitions launch in parallel and then sequentially process its steps.
-    Customers can support more sophisticated deployment graphs with additional CfnWaitConditionHandle(s).
-    '''
-    for fileName in listdir(job_definition_directory):
-      if not fileName.endswith(".json"):
-        continue
-
-      fileName = path.join(job_definition_directory, fileName)
-      definition = JobDefinition(fileName)
+    self.deploy_tool = deploy_tool
+    for definition in job_definitions:
       self.provision(definition)
 
   def provision(self,job_definition:JobDefinition)->None:
@@ -366,6 +472,9 @@ class CfnMultiRegionOrcheratorStack(core.Stack):
         "stack_name": str
         "region_name": str
         "wait_handle": str
+        "module_name": str
+        "summary": bool
+        "execution_id": str (added by the workflow)
         "parameters": {
           "foo": str,
           "bar": str
@@ -373,12 +482,18 @@ class CfnMultiRegionOrcheratorStack(core.Stack):
       }
     }
     '''
+    summary = job_definition.signal_mode == 'summary'
     stacks:List[Mapping[str,Mapping[str,Any]]] = [x.to_inputRequest() for x in job_definition.stacks]
     for stack in stacks:
       stack['inputRequest']['wait_handle'] = wait_handle.ref
+      stack['inputRequest']['module_name'] = job_definition.module_name
+      stack['inputRequest']['summary'] = summary
 
     input={
-      'stacks': stacks
+      'stacks': stacks,
+      'module_name': job_definition.module_name,
+      'wait_handle': wait_handle.ref,
+      'summary': summary,
     }
 
     '''
@@ -414,9 +529,113 @@ class CfnMultiRegionOrcheratorStack(core.Stack):
 
     core.CfnWaitCondition(self,'WaitCondition_'+job_definition.module_name,
       handle=wait_handle.ref,
-      count= len(stacks),
+      count= 1 if summary else len(stacks),
       timeout=job_definition.timeout)
 
+class CfnMultiRegionOrcheratorStack(core.Stack):
+  '''
+  Represents the Amazon CloudFormation Stack that contains the deployment tool.
+  After deploying the Step Function, the Stack will also deploy every file under `job-definitions`.
+
+  If there are multiple job-definitions files they will each run in parallel. Its declared steps run sequentially.
+  The job-definitions are split across OrchestratorShard(s) that share the one DeploymentWorkflow.
+  '''
+  def __init__(self, scope:core.Construct,id:str) -> None:
+    super().__init__(scope,id)
+    core.Tags.of(self).add('topology','blueprint:cfn-multiregion-orchestration')
+
+    self.deploy_tool = DeploymentWorkflow(self,'Workflow')
+    self.provision_everything()
+    
+  @property
+  def shard_size(self)->int:
+    '''
+    Gets the maximum number of job-definitions per shard (context key `shardSize`).
+    '''
+    shard_size = self.node.try_get_context('shardSize')
+    if shard_size is None:
+      shard_size = 50
+    assert int(shard_size) > 0, "Context shardSize must be positive, found %s" % shard_size
+    return int(shard_size)
+
+  @property
+  def min_shard_count(self)->int:
+    '''
+    Gets the minimum number of hashed shards for unlabeled job-definitions (context key `shardCount`).
+    '''
+    shard_count = self.node.try_get_context('shardCount')
+    if shard_count is None:
+      shard_count = 4
+    assert int(shard_count) > 0, "Context shardCount must be positive, found %s" % shard_count
+    return int(shard_count)
+
+  @staticmethod
+  def get_bucket(module_name:str, buckets:int)->int:
+    '''
+    Assigns the module to a bucket with jump consistent hashing (https://arxiv.org/abs/1406.2294).
+    Growing from N to N+1 buckets only moves about 1/(N+1) of the modules.
+    '''
+    key = int(sha256(module_name.encode('utf-8')).hexdigest()[:16], 16)
+    bucket, candidate = -1, 0
+    while candidate < buckets:
+      bucket = candidate
+      key = (key * 2862933555777941757 + 1) % (1 << 64)
+      candidate = int((bucket + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return bucket
+
+  def get_shard_count(self, module_names:List[str])->int:
+    '''
+    Gets the fewest hashed shards (at least `shardCount`) where no shard exceeds `shardSize`.
+    A growing fleet adds shards one at a time, so each step moves only a small fraction of the modules.
+    '''
+    shard_count = max(self.min_shard_count, -(-len(module_names) // self.shard_size))
+    while True:
+      counts:Dict[int,int] = {}
+      for module_name in module_names:
+        bucket = CfnMultiRegionOrcheratorStack.get_bucket(module_name, shard_count)
+        counts[bucket] = counts.get(bucket, 0) + 1
+      if max(counts.values(), default=0) <= self.shard_size:
+        return shard_count
+      shard_count += 1
+
+  def provision_everything(self):
+    '''
+    Discovers all job-definitions within the `job-definitions` folder.
+    
+    Job Definitions launch in parallel and then sequentially process its steps.
+    Customers can support more sophisticated deployment graphs with additional CfnWaitConditionHandle(s).
+
+    Definitions that declare a `shard` label are grouped into that shard.
+    The remainder are consistently hashed by module name into as many shards as needed to keep each within `shardSize`.
+    '''
+    shards:Dict[str,List[JobDefinition]] = {}
+    unlabeled:List[JobDefinition] = []
+    for fileName in sorted(listdir(job_definition_directory)):
+      if not fileName.endswith(".json"):
+        continue
+
+      fileName = path.join(job_definition_directory, fileName)
+      definition = JobDefinition(fileName)
+      if definition.shard is None:
+        unlabeled.append(definition)
+      else:
+        shards.setdefault('Shard-label-' + definition.shard,[]).append(definition)
+
+    shard_count = self.get_shard_count([x.module_name for x in unlabeled])
+    for definition in unlabeled:
+      bucket = CfnMultiRegionOrcheratorStack.get_bucket(definition.module_name, shard_count)
+      shards.setdefault('Shard-auto-%d' % bucket,[]).append(definition)
+
+    for name, job_definitions in shards.items():
+      assert len(job_definitions) <= self.shard_size, "{name} has {count} modules but shardSize is {size}; split the label".format(
+        name=name,
+        count=len(job_definitions),
+        size=self.shard_size)
+
+      OrchestratorShard(self,name,
+        deploy_tool=self.deploy_tool,
+        job_definitions=job_definitions)
+
 '''
 Finally synthize all resources.
 '''
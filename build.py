@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+#########################################################
+# Builds the Lambda packages and the Event Engine template.
+#
+#   ./build.py functions  -- package every src/<name> into bin/<name>.zip
+#   ./build.py assets     -- zip cdk.out assets and write EventEngine.template.json
+#########################################################
+from os import PathLike, environ, makedirs, path, remove, replace, stat, walk
+from typing import Any, Dict, List, Mapping
+from json import dumps, loads
+from hashlib import sha256
+from shutil import copyfile, rmtree
+from subprocess import check_call
+from sys import argv, executable, exit
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+import zipfile
+
+root_directory = path.dirname(path.abspath(__file__))
+src_directory = path.join(root_directory, 'src')
+shared_directory = path.join(src_directory, 'shared')
+bin_directory = path.join(root_directory, 'bin')
+packages_directory = path.join(root_directory, 'packages')
+cdkout_directory = path.join(root_directory, 'cdk.out')
+
+'''
+Every package entry gets the same timestamp so identical inputs produce identical zips.
+That keeps the CDK asset hash (and therefore the S3 key) stable between builds.
+'''
+ZIP_TIMESTAMP = (1980, 1, 1, 0, 0, 0)
+LAMBDA_FUNCTIONS = ['preaction', 'launch', 'monitor', 'complete']
+IGNORED_DIRECTORIES = ['__pycache__']
+IGNORED_EXTENSIONS = ['.pyc', '.pyo']
+
+def hash_file(file_name:PathLike)->str:
+  '''
+  Gets the sha256 of a file's content.
+  '''
+  digest = sha256()
+  with open(file_name, 'rb') as f:
+    for chunk in iter(lambda: f.read(1024*1024), b''):
+      digest.update(chunk)
+  return digest.hexdigest()
+
+def list_files(directory:PathLike)->List[str]:
+  '''
+  Gets every file beneath the directory as sorted, relative paths.
+  '''
+  results = []
+  for parent, dirs, files in walk(directory):
+    dirs[:] = [x for x in dirs if not x in IGNORED_DIRECTORIES]
+    for name in files:
+      if path.splitext(name)[1] in IGNORED_EXTENSIONS:
+        continue
+      results.append(path.relpath(path.join(parent, name), directory))
+  return sorted(results)
+
+def add_file(archive:zipfile.ZipFile, file_name:PathLike, arcname:str)->None:
+  '''
+  Adds a file to the archive with normalized metadata.
+  '''
+  info = zipfile.ZipInfo(arcname.replace(path.sep, '/'), date_time=ZIP_TIMESTAMP)
+  info.compress_type = zipfile.ZIP_DEFLATED
+  info.create_system = 3
+  info.external_attr = (0o100755 if is_executable(file_name) else 0o100644) << 16
+  with open(file_name, 'rb') as f:
+    archive.writestr(info, f.read(), compresslevel=9)
+
+def is_executable(file_name:PathLike)->bool:
+  '''
+  Determines if the file has any execute bit set.
+  '''
+  return bool(stat(file_name).st_mode & 0o111)
+
+def zip_directory(directory:PathLike, file_name:PathLike, mode:str='w')->None:
+  '''
+  Writes (or appends) the directory's content into a reproducible zip.
+  '''
+  with zipfile.ZipFile(file_name, mode) as archive:
+    for relative in list_files(directory):
+      add_file(archive, path.join(directory, relative), relative)
+
+def publish(staging:PathLike, file_name:PathLike)->bool:
+  '''
+  Moves the staged zip into place unless the content is unchanged.
+  Leaving identical files alone preserves their timestamps for incremental tooling.
+  '''
+  if path.exists(file_name) and hash_file(file_name) == hash_file(staging):
+    remove(staging)
+    return False
+
+  replace(staging, file_name)
+  return True
+
+class DependencyLayers:
+  '''
+  Caches the pip installed dependencies, keyed by a hash of requirements.txt.
+  Functions that declare identical requirements share one layer.
+  '''
+  def __init__(self, directory:PathLike) -> None:
+    assert not directory is None, "DependencyLayers init called without directory"
+    self.__directory = directory
+    self.__locks:Dict[str,Lock] = {}
+    self.__guard = Lock()
+
+  def get_layer(self, requirements:PathLike)->str:
+    '''
+    Gets the zip containing the installed requirements, building it on first use.
+    '''
+    key = hash_file(requirements)
+    with self.__guard:
+      lock = self.__locks.setdefault(key, Lock())
+
+    layer_zip = path.join(self.__directory, key + '.zip')
+    with lock:
+      if path.exists(layer_zip):
+        print('Reusing dependency layer %s for %s' % (key[:12], requirements))
+        return layer_zip
+
+      print('Installing dependency layer %s for %s' % (key[:12], requirements))
+      layer_directory = path.join(self.__directory, key)
+      if path.exists(layer_directory):
+        rmtree(layer_directory)
+
+      check_call([executable, '-m', 'pip', 'install', '--quiet', '--no-compile',
+        '-t', layer_directory, '-r', requirements])
+
+      zip_directory(layer_directory, layer_zip + '.tmp')
+      replace(layer_zip + '.tmp', layer_zip)
+      return layer_zip
+
+def build_function(layers:DependencyLayers, lambda_name:str)->str:
+  '''
+  Packages rootdir\\src\\name as rootdir\\bin\\name.zip.
+  The cached dependency layer is copied as-is and the function and shared sources are appended.
+  '''
+  source_directory = path.join(src_directory, lambda_name)
+  if not path.exists(source_directory):
+    raise FileNotFoundError("Unable to find lambda sources for %s" % lambda_name)
+
+  file_name = path.join(bin_directory, lambda_name + '.zip')
+  staging = file_name + '.tmp'
+
+  requirements = path.join(source_directory, 'requirements.txt')
+  if path.exists(requirements):
+    copyfile(layers.get_layer(requirements), staging)
+    mode = 'a'
+  else:
+    mode = 'w'
+
+  with zipfile.ZipFile(staging, mode) as archive:
+    for directory in [shared_directory, source_directory]:
+      for relative in list_files(directory):
+        if relative.endswith('.py'):
+          add_file(archive, path.join(directory, relative), relative)
+
+  changed = publish(staging, file_name)
+  print('%s %s.zip (%s)' % ('Built' if changed else 'Unchanged', lambda_name, hash_file(file_name)[:12]))
+  return file_name
+
+def build_functions()->None:
+  '''
+  Packages every Lambda function in parallel.
+  '''
+  makedirs(bin_directory, exist_ok=True)
+  makedirs(packages_directory, exist_ok=True)
+
+  layers = DependencyLayers(packages_directory)
+  with ThreadPoolExecutor(max_workers=len(LAMBDA_FUNCTIONS)) as pool:
+    list(pool.map(lambda name: build_function(layers, name), LAMBDA_FUNCTIONS))
+
+class AssetManifest:
+  '''
+  Represents the file assets that `cdk synth` declared in cdk.out/manifest.json.
+  '''
+  def __init__(self, directory:PathLike) -> None:
+    assert not directory is None, "AssetManifest init called without directory"
+    self.__directory = directory
+
+    file_name = path.join(directory, 'manifest.json')
+    if not path.exists(file_name):
+      print('The cloud assembly manifest does not exist - %s' % file_name)
+      raise FileNotFoundError(file_name)
+
+    with open(file_name, 'r') as f:
+      self.__props = loads(f.read())
+
+  @property
+  def stacks(self)->Mapping[str,List[Mapping[str,Any]]]:
+    '''
+    Gets the asset metadata for each CloudFormation stack artifact.
+    '''
+    results = {}
+    for name, artifact in self.__props.get('artifacts', {}).items():
+      if artifact.get('type') != 'aws:cloudformation:stack':
+        continue
+
+      assets = []
+      for entries in artifact.get('metadata', {}).values():
+        assets.extend([x['data'] for x in entries if x.get('type') == 'aws:cdk:asset'])
+      results[name] = assets
+    return results
+
+  def template_path(self, stack_name:str)->str:
+    '''
+    Gets the synthesized template for the given stack.
+    '''
+    artifact = self.__props['artifacts'][stack_name]
+    return path.join(self.__directory, artifact['properties']['templateFile'])
+
+  @staticmethod
+  def get_object_name(asset:Mapping[str,Any])->str:
+    '''
+    Gets the name of the uploaded object for this asset.
+    '''
+    if asset['packaging'] == 'file':
+      return path.basename(asset['path'])
+    return path.basename(asset['path']) + '.zip'
+
+def get_asset_bucket()->str:
+  '''
+  Determines what bucket to use.
+  '''
+  bucket = environ.get('TEMPLATE_ASSET_BUCKET')
+  if not bucket is None:
+    return bucket
+
+  bucket = environ.get('S3_ASSET_BUCKET')
+  if not bucket is None:
+    return bucket
+
+  raise ValueError('Missing env TEMPLATE_ASSET_BUCKET and S3_ASSET_BUCKET')
+
+def zip_asset(asset:Mapping[str,Any])->None:
+  '''
+  Compresses a directory asset next to its staging folder.
+  '''
+  if asset['packaging'] == 'file':
+    return
+
+  directory = path.join(cdkout_directory, asset['path'])
+  file_name = path.join(cdkout_directory, AssetManifest.get_object_name(asset))
+  zip_directory(directory, file_name + '.tmp')
+  publish(file_name + '.tmp', file_name)
+
+def build_assets()->None:
+  '''
+  Fix the parameters so the cloudformation template works with Event Engine.
+  '''
+  manifest = AssetManifest(cdkout_directory)
+  bucket = get_asset_bucket()
+  prefix = environ.get('S3_ASSET_PREFIX')
+
+  stacks = manifest.stacks
+  assert len(stacks) == 1, "Event Engine expects a single template, found %s" % list(stacks.keys())
+
+  for stack_name, assets in stacks.items():
+    with ThreadPoolExecutor() as pool:
+      list(pool.map(zip_asset, assets))
+
+    with open(manifest.template_path(stack_name), 'rt') as f:
+      content = loads(f.read())
+
+    parameters:dict = content.get('Parameters', {})
+    for asset in assets:
+      parameters[asset['s3BucketParameter']]['Default'] = bucket
+      parameters[asset['s3KeyParameter']]['Default'] = '%s/||%s' % (prefix, AssetManifest.get_object_name(asset))
+      parameters[asset['artifactHashParameter']]['Default'] = asset['sourceHash']
+
+    with open(path.join(cdkout_directory, 'EventEngine.template.json'), 'w') as f:
+      f.write(dumps(content, indent=2))
+
+if __name__ == '__main__':
+  commands = {
+    'functions': build_functions,
+    'assets': build_assets,
+  }
+
+  if len(argv) != 2 or not argv[1] in commands:
+    print('Usage: %s [%s]' % (argv[0], '|'.join(commands.keys())))
+    exit(1)
+
+  commands[argv[1]]()
@@ -32,28 +32,10 @@ echo "Asset Upload Bucket:  ${S3_ASSET_BUCKET}"
 echo "........with prefix:  ${S3_ASSET_PREFIX}"
 echo "Deployment Bucket  :  ${TEMPLATE_ASSET_BUCKET}"
 
-mkdir -p packages
-mkdir -p bin/
-rm -f bin/*.zip
-
-function make_pkg {
 echo ==========================
-echo Making $1.zip
+echo Making Lambda packages
 echo ==========================
-pip install -t packages/$1 -r src/$1/requirements.txt
-pushd packages/$1
-zip -r ../../bin/$1.zip .
-popd
-echo "adding custom python sources"
-pushd src/$1
-zip -g ../../bin/$1.zip *.py
-popd
-}
-
-make_pkg preaction
-make_pkg launch
-make_pkg monitor
-make_pkg complete
+./build.py functions || exit 1
 
 echo ==========================
 echo Synthesize the code
@@ -64,19 +46,9 @@ rm -rf cdk.out/*
 cdk synth --app ./app.py
 
 echo ==========================
-echo Zip codegen components 
-echo ==========================
-for f in `ls cdk.out/ | grep asset | grep -v .zip`
-do
-pushd cdk.out/$f
-zip -r ../$f.zip *
-popd
-done
-
-echo ==========================
-echo Fix the parameters for Event Engine 
+echo Zip codegen components and fix the parameters for Event Engine
 echo ==========================
-./ee-util.py
+./build.py assets || exit 1
 cat cdk.out/EventEngine.template.json | jq '.Parameters'
 
 echo ==========================
@@ -85,8 +57,11 @@ echo ==========================
 
 if [ -z "$CI_JOB_TOKEN" ]
 then
-echo aws s3 cp --recursive cdk.out/ s3://$S3_ASSET_BUCKET/$S3_ASSET_PREFIX/
-aws s3 cp --recursive cdk.out/ s3://$S3_ASSET_BUCKET/$S3_ASSET_PREFIX/
+# Asset zips are named by their content hash, so existing objects never need re-uploading
+echo aws s3 sync --size-only --exclude "'*'" --include "'asset.*.zip'" cdk.out/ s3://$S3_ASSET_BUCKET/$S3_ASSET_PREFIX/
+aws s3 sync --size-only --exclude '*' --include 'asset.*.zip' cdk.out/ s3://$S3_ASSET_BUCKET/$S3_ASSET_PREFIX/
+echo aws s3 cp --recursive --exclude "'asset.*'" cdk.out/ s3://$S3_ASSET_BUCKET/$S3_ASSET_PREFIX/
+aws s3 cp --recursive --exclude 'asset.*' cdk.out/ s3://$S3_ASSET_BUCKET/$S3_ASSET_PREFIX/
 else
 pushd cdk.out
 zip -r ../deployer.zip .
@@ -1,14 +1,36 @@
-import requests
-from json import dumps
-from requests.models import CaseInsensitiveDict
+from typing import Any, Optional
+from logger import get_logger
+from signaler import get_signaler
 
-def function_main(event:dict, _:dict)->dict:
+logger = get_logger('complete')
+
+'''
+Seconds reserved after the last signal attempt so the function returns before it times out.
+'''
+TIMEOUT_MARGIN = 5
+
+def get_time_budget(context:Any)->Optional[float]:
+  '''
+  Gets how long the signaler may retry within this invocation.
+  '''
+  if not hasattr(context, 'get_remaining_time_in_millis'):
+    return None
+  return max(0, context.get_remaining_time_in_millis() / 1000 - TIMEOUT_MARGIN)
+
+def function_main(event:dict, context:dict)->dict:
   '''
   Signals the WaitHandle that the step function is complete.
 
+  Modules using `"signal": "summary"` skip the per-stack success signals.
+  Instead, the workflow calls this function once more with every step's result.
+
   https://docs.aws.amazon.com/AWSCloudFormation/latest/UserGuide/using-cfn-waitcondition.html
   '''
-  print(dumps(event))
+  logger.bind(event, context)
+  logger.debug('Received event', event=event)
+
+  if 'results' in event:
+    return signal_module(event, context)
 
   assert 'stack_name' in event, "missing stack_name"
   assert 'wait_handle' in event, "missing wait_handle"
@@ -20,20 +42,67 @@ def function_main(event:dict, _:dict)->dict:
   if 'error' in event:
     status='FAILURE'
 
-  data = {
-    "Status" : status,
-    "Reason" : "Configuration Complete",
-    "UniqueId" : stack_name,
-    "Data" : "Application has completed configuration."
+  result = {
+    'stack_name': stack_name,
+    'region_name': event.get('region_name'),
+    'status': status,
   }
 
-  print(dumps(data))
-  headers=CaseInsensitiveDict()
-  headers['Accept'] = 'application/json'
-  headers['Content-Type'] = 'application/json'
+  '''
+  Summary modules only signal early to report a failure.
+  '''
+  if event.get('summary') == True:
+    if status == 'SUCCESS':
+      logger.info('Deferring to the module summary signal', status=status)
+      return result
+
+    unique_id = event['module_name']
+    data = {'results': [result]}
+  else:
+    unique_id = stack_name
+    data = "Application has completed configuration."
 
-  result = requests.put(wait_handle,headers=headers, data=dumps(data))
-  print(result)
+  logger.info('Signaling the wait handle', status=status, unique_id=unique_id)
+  sent = get_signaler().signal(wait_handle,
+    unique_id=unique_id,
+    status=status,
+    reason="Configuration Complete",
+    data=data,
+    time_budget=get_time_budget(context))
+  logger.info('Signaled the wait handle', sent=sent)
+  return result
+
+def signal_module(event:dict, context:dict)->dict:
+  '''
+  Sends the single summary signal for a module with the result of every step.
+  The workflow sets `error` when this signal could not be delivered, and then retries it as a FAILURE.
+  '''
+  assert 'module_name' in event, "missing module_name"
+  assert 'wait_handle' in event, "missing wait_handle"
+
+  results:list = event['results']
+  status = 'SUCCESS'
+  reason = "Module configuration complete"
+  if any([x.get('status') != 'SUCCESS' for x in results]):
+    status = 'FAILURE'
+  data = {'results': results}
+  if 'error' in event:
+    status = 'FAILURE'
+    reason = "Unable to deploy or report the module"
+    data['error'] = event['error'].get('Error') if isinstance(event['error'], dict) else str(event['error'])
+
+  logger.info('Signaling the module summary', status=status, steps=len(results))
+  sent = get_signaler().signal(event['wait_handle'],
+    unique_id=event['module_name'],
+    status=status,
+    reason=reason,
+    data=data,
+    time_budget=get_time_budget(context))
+  logger.info('Signaled the wait handle', sent=sent)
+  return {
+    'status': status,
+    'results': results,
+  }
 
 if __name__ == '__main__':
   '''
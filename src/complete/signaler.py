@@ -0,0 +1,169 @@
+import requests
+from json import dumps, loads
+from hashlib import sha256
+from random import uniform
+from time import monotonic, sleep
+from typing import Any, Callable, Dict, Optional, Tuple
+from requests.adapters import HTTPAdapter
+
+'''
+Sends CloudFormation wait condition signals.
+
+https://docs.aws.amazon.com/AWSCloudFormation/latest/UserGuide/using-cfn-waitcondition.html
+'''
+RETRYABLE_STATUS_CODES = [408, 429, 500, 502, 503, 504]
+
+class SignalError(Exception):
+  '''
+  Raised when every attempt to signal the wait handle fails.
+  '''
+  pass
+
+class SignalRejectedError(SignalError):
+  '''
+  Raised when the wait handle permanently rejects the signal (e.g., 403 from an expired url).
+  Retrying will not help, so the workflow does not retry it.
+  '''
+  pass
+
+class WaitHandleSignaler:
+  '''
+  Signals presigned wait handle urls with retries, jittered backoff and a pooled session.
+  CloudFormation keeps one signal per UniqueId, so resending the same signal is safe.
+
+  The defaults give up after roughly 40 seconds, well within the function's one minute timeout.
+  '''
+  def __init__(self,
+    max_attempts:int=4,
+    base_delay:float=0.5,
+    max_delay:float=4.0,
+    timeout:Tuple[float,float]=(3.05, 6),
+    session:Optional[requests.Session]=None,
+    sleep:Callable[[float],None]=sleep) -> None:
+    assert max_attempts > 0, "WaitHandleSignaler requires at least one attempt"
+    self.__max_attempts = max_attempts
+    self.__base_delay = base_delay
+    self.__max_delay = max_delay
+    self.__timeout = timeout
+    self.__sleep = sleep
+    self.__delivered:Dict[Tuple[str,str],str] = {}
+
+    if session is None:
+      session = requests.Session()
+      session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=4))
+      session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=4))
+    self.__session = session
+
+  def signal(self, wait_handle:str, unique_id:str, status:str, reason:str, data:Any, time_budget:Optional[float]=None)->bool:
+    '''
+    Sends the signal unless this exact signal was already delivered.
+    Retries stop once `time_budget` seconds have elapsed (e.g., the Lambda's remaining time).
+    Returns False when the signal was skipped as a duplicate.
+    '''
+    assert not wait_handle is None, "signal called without wait_handle"
+    assert not unique_id is None, "signal called without unique_id"
+    assert status in ['SUCCESS','FAILURE'], "signal called with unknown status %s" % status
+
+    body = dumps({
+      "Status" : status,
+      "Reason" : reason,
+      "UniqueId" : unique_id,
+      "Data" : data if isinstance(data, str) else dumps(data),
+    })
+
+    key = (wait_handle, unique_id)
+    digest = sha256(body.encode('utf-8')).hexdigest()
+    if self.__delivered.get(key) == digest:
+      return False
+
+    self.put(wait_handle, body, time_budget)
+    self.__delivered[key] = digest
+    return True
+
+  def put(self, url:str, body:str, time_budget:Optional[float]=None)->requests.Response:
+    '''
+    Uploads the body, retrying connection errors, timeouts and throttling.
+    Each attempt's timeout and backoff are clamped to the remaining time budget.
+    '''
+    headers = {
+      'Accept': 'application/json',
+      'Content-Type': 'application/json',
+    }
+
+    deadline = None if time_budget is None else monotonic() + time_budget
+    last_error = None
+    attempts = 0
+    for attempt in range(self.__max_attempts):
+      if attempt > 0:
+        delay = self.backoff(attempt)
+        if not deadline is None:
+          delay = min(delay, max(0, deadline - monotonic()))
+        self.__sleep(delay)
+
+      timeout = self.__timeout
+      if not deadline is None:
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+          break
+        timeout = (min(timeout[0], remaining), min(timeout[1], remaining))
+
+      attempts += 1
+      try:
+        response = self.__session.put(url, headers=headers, data=body, timeout=timeout)
+      except (requests.ConnectionError, requests.Timeout) as error:
+        last_error = error
+        continue
+
+      if response.status_code < 300:
+        return response
+      if not response.status_code in RETRYABLE_STATUS_CODES:
+        raise SignalRejectedError('Wait handle rejected the signal with %d - %s' % (response.status_code, response.text[:256]))
+      last_error = SignalError('Wait handle returned %d' % response.status_code)
+
+    raise SignalError('Unable to signal the wait handle after %d attempts - %s' % (attempts, str(last_error)))
+
+  def backoff(self, attempt:int)->float:
+    '''
+    Gets the full jitter delay before the given attempt.
+    '''
+    return uniform(0, min(self.__max_delay, self.__base_delay * (2 ** (attempt - 1))))
+
+'''
+Share one signaler per container so warm invocations reuse its connections.
+'''
+_signaler:Optional[WaitHandleSignaler] = None
+
+def get_signaler()->WaitHandleSignaler:
+  '''
+  Gets the container's shared WaitHandleSignaler.
+  '''
+  global _signaler
+  if _signaler is None:
+    _signaler = WaitHandleSignaler()
+  return _signaler
+
+if __name__ == '__main__':
+  '''
+  Debug against a local stand-in for the wait handle that drops the first request.
+  '''
+  from http.server import BaseHTTPRequestHandler, HTTPServer
+  from threading import Thread
+
+  received = []
+  class StandIn(BaseHTTPRequestHandler):
+    def do_PUT(self):
+      body = self.rfile.read(int(self.headers['Content-Length']))
+      received.append(loads(body))
+      self.send_response(503 if len(received) == 1 else 200)
+      self.send_header('Content-Length','0')
+      self.end_headers()
+
+  server = HTTPServer(('127.0.0.1', 0), StandIn)
+  Thread(target=server.serve_forever, daemon=True).start()
+  wait_handle = 'http://127.0.0.1:%d/WaitHandle' % server.server_port
+
+  signaler = WaitHandleSignaler(base_delay=0.1)
+  assert signaler.signal(wait_handle, 'Debug', 'SUCCESS', 'Configuration Complete', {'Debug': 'SUCCESS'}, time_budget=5)
+  assert not signaler.signal(wait_handle, 'Debug', 'SUCCESS', 'Configuration Complete', {'Debug': 'SUCCESS'})
+  server.shutdown()
+  print('Stand-in received %d requests: %s' % (len(received), dumps(received[-1])))
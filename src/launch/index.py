@@ -1,6 +1,6 @@
 import boto3
 import requests
-from json import dumps
+from logger import get_logger, hash_text
 
 '''
 Initialize AWS XRAY available.
@@ -12,9 +12,11 @@ try:
 except:
   XRAY_AVAILABLE=False
 
+logger = get_logger('launch')
 
 def function_main(event:dict, context:dict)->dict:
-  print(dumps(event))
+  logger.bind(event, context)
+  logger.debug('Received event', event=event)
 
   assert 'region_name' in event, "missing region_name"
   assert 'stack_name' in event, "missing stack_name"
@@ -30,7 +32,7 @@ def function_main(event:dict, context:dict)->dict:
   Fetch the template
   '''
   template = requests.get(url=template_path).text
-  print(template)
+  logger.info('Fetched the template', template_path=template_path, template=hash_text(template))
 
   client = boto3.client('cloudformation', region_name=region_name)
   try:
@@ -47,10 +49,12 @@ def function_main(event:dict, context:dict)->dict:
         'UsePreviousValue': True,
       } for x in parameters.keys()])
 
+    logger.info('Creating the stack')
     return {
       'status': 'Creating the stack %s' % stack_name
     }
   except client.exceptions.AlreadyExistsException as error:
+    logger.info('Stack already exists')
     return {
       'status': 'Stack %s AlreadyExists; returning existing' % stack_name,
     }
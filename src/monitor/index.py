@@ -1,5 +1,7 @@
 import boto3
-from json import dumps
+from logger import get_logger
+
+logger = get_logger('monitor')
 
 def function_main(event:dict, context:dict)->dict:
   '''
@@ -17,7 +19,8 @@ def function_main(event:dict, context:dict)->dict:
 
   https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/cloudformation.html#CloudFormation.Client.describe_stacks
   '''
-  print(dumps(event))
+  logger.bind(event, context)
+  logger.sample('Received event', event=event)
 
   assert 'region_name' in event, "missing region_name"
   assert 'stack_name' in event, "missing stack_name"
@@ -31,13 +34,17 @@ def function_main(event:dict, context:dict)->dict:
       StackName=stack_name,
     )
   except Exception as error:
-    print(str(error))
+    logger.error('Unable to describe_stacks()', error=str(error))
     raise error
 
   status = [x['StackStatus'] for x in response['Stacks']]
   if len(status) == 0:
     return {'status': 'CREATE_NOT_STARTED' }
   if len(status) == 1:
+    if status[0].endswith('_IN_PROGRESS'):
+      logger.sample('Stack status', status=status[0])
+    else:
+      logger.info('Stack status', status=status[0])
     return {'status': status[0] }
   else:
     raise NotImplementedError('This is not expected...')
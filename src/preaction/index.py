@@ -1,5 +1,5 @@
 import boto3
-from json import dumps
+from logger import get_logger
 
 '''
 Initialize AWS XRAY available.
@@ -11,9 +11,11 @@ try:
 except:
   XRAY_AVAILABLE=False
 
+logger = get_logger('preaction')
 
 def function_main(event:dict, context:dict)->dict:
-  print(dumps(event))
+  logger.bind(event, context)
+  logger.debug('Received event', event=event)
 
   assert 'region_name' in event, "missing region_name"
   assert 'stack_name' in event, "missing stack_name"
@@ -33,7 +35,7 @@ def function_main(event:dict, context:dict)->dict:
       }
     ])
   except Exception as error:
-    print('Unable to describe_vpcs()')
+    logger.error('Unable to describe_vpcs()', error=str(error))
     raise error
 
   '''
@@ -41,7 +43,7 @@ def function_main(event:dict, context:dict)->dict:
   '''
   param_value = [vpc['VpcId'] for vpc in response['Vpcs'] if vpc['IsDefault']]
   if not len(param_value) == 1:
-    print('Unexpected default vpc count %d' % len(param_value))
+    logger.error('Unexpected default vpc count', count=len(param_value))
     raise ValueError('Unexpected default vpc count')
   else:
     param_value = param_value[0]
@@ -57,9 +59,11 @@ def function_main(event:dict, context:dict)->dict:
       Type='String',
       Value=param_value)
   except Exception as error:
-    print('Unable to put_parameter(%s) = %s' % (param_name, param_value))
+    logger.error('Unable to put_parameter', param_name=param_name, param_value=param_value, error=str(error))
     raise error
 
+  logger.info('Persisted the default vpc', param_name=param_name, param_value=param_value)
+
 if __name__ == '__main__':
   '''
   Debug the local run...
@@ -0,0 +1,146 @@
+from os import environ
+from json import dumps
+from hashlib import sha256
+from random import random
+from time import time
+from typing import Any, Mapping, Optional
+
+'''
+Structured logging shared by every Lambda function.
+The build copies this file into each package next to index.py.
+
+Environment:
+  LOG_LEVEL            - DEBUG|INFO|WARNING|ERROR (default INFO)
+  LOG_SAMPLE_RATE      - fraction of repetitive poll messages to keep (default 0.1)
+  LOG_MAX_FIELD_LENGTH - maximum characters per field (default 1024)
+'''
+LEVELS = {
+  'DEBUG': 10,
+  'INFO': 20,
+  'WARNING': 30,
+  'ERROR': 40,
+}
+
+def hash_text(text:str)->Mapping[str,Any]:
+  '''
+  Summarizes large text (e.g., a template body) without logging its content.
+  '''
+  encoded = (text or '').encode('utf-8')
+  return {
+    'sha256': sha256(encoded).hexdigest(),
+    'bytes': len(encoded),
+  }
+
+class StructuredLogger:
+  '''
+  Writes one JSON line per message with the correlation ids of the current invocation.
+  '''
+  def __init__(self, name:str, level:Optional[str]=None, sample_rate:Optional[float]=None, max_field_length:Optional[int]=None) -> None:
+    assert not name is None, "StructuredLogger init called without name"
+    self.__name = name
+    self.__level = LEVELS.get((level or environ.get('LOG_LEVEL', 'INFO')).upper(), LEVELS['INFO'])
+    self.__sample_rate = float(sample_rate if not sample_rate is None else environ.get('LOG_SAMPLE_RATE', '0.1'))
+    self.__max_field_length = int(max_field_length if not max_field_length is None else environ.get('LOG_MAX_FIELD_LENGTH', '1024'))
+    self.__correlation:Mapping[str,Any] = {}
+
+  @property
+  def name(self)->str:
+    '''
+    Gets the name of the function writing these logs.
+    '''
+    return self.__name
+
+  def bind(self, event:Mapping[str,Any], context:Any)->None:
+    '''
+    Captures the execution and stack correlation ids for every subsequent message.
+    The workflow passes the Step Function's execution id; the X-Ray trace root is logged when tracing is active.
+    '''
+    trace_id = environ.get('_X_AMZN_TRACE_ID', '')
+    self.__correlation = {
+      'execution_id': event.get('execution_id'),
+      'trace_id': trace_id.split(';')[0].replace('Root=','') or None,
+      'request_id': getattr(context, 'aws_request_id', None),
+      'module_name': event.get('module_name'),
+      'stack_name': event.get('stack_name'),
+      'region_name': event.get('region_name'),
+    }
+
+  def is_enabled(self, level:str)->bool:
+    '''
+    Determines if messages at this level are written.
+    '''
+    return LEVELS[level] >= self.__level
+
+  def debug(self, message:str, /, **fields)->None:
+    '''
+    Writes the message at DEBUG level.
+    '''
+    self.log('DEBUG', message, fields)
+
+  def info(self, message:str, /, **fields)->None:
+    '''
+    Writes the message at INFO level.
+    '''
+    self.log('INFO', message, fields)
+
+  def warning(self, message:str, /, **fields)->None:
+    '''
+    Writes the message at WARNING level.
+    '''
+    self.log('WARNING', message, fields)
+
+  def error(self, message:str, /, **fields)->None:
+    '''
+    Writes the message at ERROR level.
+    '''
+    self.log('ERROR', message, fields)
+
+  def sample(self, message:str, /, **fields)->None:
+    '''
+    Writes a repetitive message (e.g., a status poll) for only a fraction of invocations.
+    Every message is kept when the level is DEBUG.
+    '''
+    if self.is_enabled('DEBUG'):
+      self.log('DEBUG', message, fields)
+    elif random() < self.__sample_rate:
+      self.log('INFO', message, fields, sampled=self.__sample_rate)
+
+  def log(self, level:str, message:str, fields:Mapping[str,Any], sampled:Optional[float]=None)->None:
+    '''
+    Writes the message as a single JSON line.
+    Caller fields are nested under `fields` so they never replace the record's own keys.
+    '''
+    if not self.is_enabled(level):
+      return
+
+    record = {
+      'timestamp': round(time(), 3),
+      'level': level,
+      'logger': self.__name,
+      'message': message,
+    }
+    record.update({k:v for k,v in self.__correlation.items() if not v is None})
+    if not sampled is None:
+      record['sampled'] = sampled
+    if len(fields) > 0:
+      record['fields'] = {k:self.cap(v) for k,v in fields.items()}
+    print(dumps(record, default=str))
+
+  def cap(self, value:Any)->Any:
+    '''
+    Truncates a field to the configured maximum length.
+    '''
+    if value is None or isinstance(value, (bool, int, float)):
+      return value
+
+    text = value if isinstance(value, str) else dumps(value, default=str)
+    if len(text) <= self.__max_field_length:
+      return value
+
+    return '%s...(truncated %d chars)' % (text[:self.__max_field_length], len(text) - self.__max_field_length)
+
+def get_logger(name:str)->StructuredLogger:
+  '''
+  Creates the logger for a Lambda function.
+  '''
+  return StructuredLogger(name)